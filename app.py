@@ -1,15 +1,23 @@
+# 須在其他模組匯入前 patch，讓 LINE API 的 HTTPS 請求與推論伺服器連線都能協同切換
+from gevent import monkey
+monkey.patch_all()
+
 from flask import Flask, request, abort
 from linebot import LineBotApi, WebhookHandler
 from linebot.exceptions import InvalidSignatureError, LineBotApiError
+from linebot.http_client import RequestsHttpClient, RequestsHttpResponse
 from linebot.models import MessageEvent, TextMessage, ImageMessage, TextSendMessage
-from tensorflow.keras.models import load_model
-from PIL import Image
+import requests
+from requests.adapters import HTTPAdapter
+import cv2
 import numpy as np
 import os
 from dotenv import load_dotenv
 import logging
 import time
-from io import BytesIO
+import threading
+import queue
+from inference_protocol import open_connection, request_prediction
 
 # 設置日誌
 logging.basicConfig(level=logging.INFO)
@@ -22,40 +30,123 @@ load_dotenv()
 LINE_CHANNEL_ACCESS_TOKEN = os.getenv('LINE_CHANNEL_ACCESS_TOKEN')
 LINE_CHANNEL_SECRET = os.getenv('LINE_CHANNEL_SECRET')
 
+INFERENCE_SERVER_ADDRESS = (os.getenv('INFERENCE_SERVER_HOST', 'localhost'),
+                            int(os.getenv('INFERENCE_SERVER_PORT', 6000)))
+INFERENCE_SERVER_AUTHKEY = os.getenv('INFERENCE_SERVER_AUTHKEY')
+# 等待推論伺服器（取得連線、連線與收送）的秒數上限，逾時即回覆失敗，避免伺服器卡住時拖垮整個 worker
+INFERENCE_TIMEOUT = float(os.getenv('INFERENCE_TIMEOUT', 5))
+
 if not LINE_CHANNEL_ACCESS_TOKEN or not LINE_CHANNEL_SECRET:
     raise ValueError("LINE_CHANNEL_ACCESS_TOKEN 或 LINE_CHANNEL_SECRET 未設置")
 
+if not INFERENCE_SERVER_AUTHKEY:
+    raise ValueError("INFERENCE_SERVER_AUTHKEY 未設置")
+
+# LINE API 的 HTTP client：共用同一個 requests.Session，以連線池保持 keep-alive，避免每次請求重新 TLS 握手
+class PooledRequestsHttpClient(RequestsHttpClient):
+    def __init__(self, timeout=RequestsHttpClient.DEFAULT_TIMEOUT):
+        super().__init__(timeout)
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=2))
+
+    def get(self, url, headers=None, params=None, stream=False, timeout=None):
+        response = self.session.get(url, headers=headers, params=params, stream=stream,
+                                    timeout=timeout if timeout is not None else self.timeout)
+        return RequestsHttpResponse(response)
+
+    def post(self, url, headers=None, data=None, timeout=None):
+        response = self.session.post(url, headers=headers, data=data,
+                                     timeout=timeout if timeout is not None else self.timeout)
+        return RequestsHttpResponse(response)
+
+    def delete(self, url, headers=None, data=None, timeout=None):
+        response = self.session.delete(url, headers=headers, data=data,
+                                       timeout=timeout if timeout is not None else self.timeout)
+        return RequestsHttpResponse(response)
+
+    def put(self, url, headers=None, data=None, timeout=None):
+        response = self.session.put(url, headers=headers, data=data,
+                                    timeout=timeout if timeout is not None else self.timeout)
+        return RequestsHttpResponse(response)
+
 # 初始化 LINE Bot
 try:
-    line_bot_api = LineBotApi(LINE_CHANNEL_ACCESS_TOKEN)
+    line_bot_api = LineBotApi(LINE_CHANNEL_ACCESS_TOKEN, http_client=PooledRequestsHttpClient)
     handler = WebhookHandler(LINE_CHANNEL_SECRET)
     logger.info("LINE Bot 初始化成功")
 except Exception as e:
     logger.error(f"LINE Bot 初始化失敗: {str(e)}")
     raise
 
-# 載入模型
-try:
-    model = load_model('temp_model/digit_recognizer.h5')
-    logger.info("模型載入成功")
-except Exception as e:
-    logger.error(f"模型載入失敗: {str(e)}")
-    raise
+# 推論交由獨立的推論伺服器（inference_server.py）處理。
+# 同一個 worker 行程內的請求共用連線池：呼叫前取出連線，完成後歸還；連線數上限為 INFERENCE_POOL_SIZE。
+INFERENCE_POOL_SIZE = 10
+connection_pool = queue.LifoQueue()
+connection_slots = threading.BoundedSemaphore(INFERENCE_POOL_SIZE)
+
+# 送出推論請求並等待結果
+def predict_digit(img_array):
+    if not connection_slots.acquire(timeout=INFERENCE_TIMEOUT):
+        raise TimeoutError("等待推論伺服器連線逾時")
+    try:
+        try:
+            conn = connection_pool.get_nowait()
+        except queue.Empty:
+            conn = open_connection(INFERENCE_SERVER_ADDRESS, INFERENCE_SERVER_AUTHKEY.encode(),
+                                   timeout=INFERENCE_TIMEOUT)
+        try:
+            digit = request_prediction(conn, img_array.tobytes())
+        except RuntimeError:
+            # 推論伺服器回報推論失敗，連線本身仍可使用
+            connection_pool.put(conn)
+            raise
+        except Exception:
+            # 連線中斷或逾時（例如推論伺服器重啟或卡住），捨棄此連線，之後的請求會重新連線
+            conn.close()
+            raise
+        connection_pool.put(conn)
+        return digit
+    finally:
+        connection_slots.release()
 
 # 圖片預處理（從記憶體處理）
-def preprocess_image(image_data):
+def preprocess_image(image_bytes):
     try:
         start_time = time.time()
-        img = Image.open(BytesIO(image_data)).convert('L')
-        img = img.resize((28, 28), Image.Resampling.LANCZOS)
-        img_array = np.array(img) / 255.0
-        img_array = img_array.reshape(1, 28, 28, 1)
+        img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            raise ValueError("無法解碼圖片")
+        # 模型直接接受 uint8 像素值，不需再除以 255
+        img_array = cv2.resize(img, (28, 28), interpolation=cv2.INTER_AREA).reshape(1, 28, 28, 1)
         logger.info(f"圖片預處理完成，耗時: {time.time() - start_time:.2f}秒")
         return img_array
     except Exception as e:
         logger.error(f"圖片預處理失敗: {str(e)}")
         raise
 
+# 下載圖片內容（直接串流寫入預先配置的緩衝區，避免多餘的複製）
+def download_image(message_id):
+    message_content = line_bot_api.get_message_content(message_id)
+    headers = message_content.response.headers
+    content_length = headers.get('Content-Length')
+    # 內容經過壓縮時，解碼後的長度與 Content-Length 不同，無法預先配置
+    if not content_length or headers.get('Content-Encoding'):
+        buf = bytearray()
+        for chunk in message_content.iter_content(chunk_size=65536):
+            buf.extend(chunk)
+        return buf
+
+    buf = bytearray(int(content_length))
+    view = memoryview(buf)
+    size = 0
+    for chunk in message_content.iter_content(chunk_size=65536):
+        view[size:size + len(chunk)] = chunk
+        size += len(chunk)
+    view.release()
+    if size != len(buf):
+        del buf[size:]
+    return buf
+
 # Webhook 路由
 @app.route("/callback", methods=['POST'])
 def callback():
@@ -88,17 +179,15 @@ def handle_image_message(event):
         logger.info(f"收到圖片訊息，ID: {event.message.id}")
         
         # 獲取圖片內容
-        message_content = line_bot_api.get_message_content(event.message.id)
-        image_data = message_content.content
+        image_bytes = download_image(event.message.id)
         logger.info(f"圖片下載完成，耗時: {time.time() - start_time:.2f}秒")
         
         # 預處理圖片（記憶體處理）
-        img_array = preprocess_image(image_data)
+        img_array = preprocess_image(image_bytes)
         
         # 模型預測
         prediction_start = time.time()
-        prediction = model.predict(img_array)
-        predicted_digit = np.argmax(prediction, axis=1)[0]
+        predicted_digit = predict_digit(img_array)
         logger.info(f"預測結果: {predicted_digit}, 預測耗時: {time.time() - prediction_start:.2f}秒")
         
         # 回應
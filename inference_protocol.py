@@ -0,0 +1,75 @@
+import hashlib
+import hmac
+import json
+import os
+import socket
+import struct
+
+# app.py 與 inference_server.py 之間的通訊協定：
+# 每個訊息為 4 位元組長度（big-endian）加上內容，只使用 socket，
+# 因此在 gevent monkey patch 之後收送都能協同切換（multiprocessing.connection 的 os.read 做不到）。
+FRAME_HEADER = struct.Struct('!I')
+MAX_FRAME_SIZE = 4096
+CHALLENGE_SIZE = 32
+
+class AuthenticationError(Exception):
+    pass
+
+def recv_exactly(sock, size):
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            raise EOFError("連線已關閉")
+        received += n
+    return bytes(buf)
+
+def send_frame(sock, payload):
+    sock.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+
+def recv_frame(sock):
+    (size,) = FRAME_HEADER.unpack(recv_exactly(sock, FRAME_HEADER.size))
+    if size > MAX_FRAME_SIZE:
+        raise ValueError(f"訊息過大: {size} 位元組")
+    return recv_exactly(sock, size)
+
+def sign_challenge(authkey, challenge):
+    return hmac.new(authkey, challenge, hashlib.sha256).digest()
+
+# 伺服器端：送出隨機 challenge，驗證 client 以 authkey 計算的 HMAC
+def deliver_challenge(sock, authkey):
+    challenge = os.urandom(CHALLENGE_SIZE)
+    send_frame(sock, challenge)
+    if not hmac.compare_digest(recv_frame(sock), sign_challenge(authkey, challenge)):
+        raise AuthenticationError("推論伺服器驗證失敗")
+    send_frame(sock, b'OK')
+
+# client 端：連線並通過驗證，回傳可重複使用的 socket；timeout 會沿用到之後每次收送
+def open_connection(address, authkey, timeout=None):
+    sock = socket.create_connection(address, timeout=timeout)
+    try:
+        send_frame(sock, sign_challenge(authkey, recv_frame(sock)))
+        if recv_frame(sock) != b'OK':
+            raise AuthenticationError("推論伺服器驗證失敗")
+    except EOFError:
+        sock.close()
+        raise AuthenticationError("推論伺服器驗證失敗")
+    except Exception:
+        sock.close()
+        raise
+    return sock
+
+# client 端：送出 28x28 uint8 圖片位元組，回傳預測數字
+def request_prediction(sock, img_bytes):
+    send_frame(sock, img_bytes)
+    response = json.loads(recv_frame(sock))
+    if 'error' in response:
+        raise RuntimeError(f"推論失敗: {response['error']}")
+    return response['digit']
+
+# 伺服器端：回傳預測結果或錯誤訊息
+def send_prediction(sock, digit=None, error=None):
+    response = {'error': str(error)} if error is not None else {'digit': digit}
+    send_frame(sock, json.dumps(response).encode())
@@ -0,0 +1,205 @@
+import os
+
+# 限制推論伺服器的 BLAS 執行緒數（須在匯入 numpy 前設定）
+NUM_THREADS = int(os.getenv('NUM_THREADS', '2'))
+os.environ.setdefault('OMP_NUM_THREADS', str(NUM_THREADS))
+os.environ.setdefault('MKL_NUM_THREADS', str(NUM_THREADS))
+os.environ.setdefault('OPENBLAS_NUM_THREADS', str(NUM_THREADS))
+
+import numpy as np
+import socket
+from dotenv import load_dotenv
+import logging
+import time
+import threading
+import queue
+from inference_protocol import (AuthenticationError, deliver_challenge, open_connection,
+                                recv_frame, send_prediction)
+
+# 設置日誌
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 載入環境變數
+load_dotenv()
+INFERENCE_SERVER_HOST = os.getenv('INFERENCE_SERVER_HOST', 'localhost')
+INFERENCE_SERVER_PORT = int(os.getenv('INFERENCE_SERVER_PORT', 6000))
+INFERENCE_SERVER_AUTHKEY = os.getenv('INFERENCE_SERVER_AUTHKEY')
+# 推論裝置：cpu（NumPy，預設）或 gpu（ONNX Runtime CUDA，需以 requirements-gpu.txt 安裝 onnxruntime-gpu）
+INFERENCE_DEVICE = os.getenv('INFERENCE_DEVICE', 'cpu').lower()
+
+# 以 NumPy 實作模型前向運算（Conv-Pool-Conv-Pool-Dense-Dense），推論時不需載入深度學習框架
+def conv2d_relu(x, kernel, bias):
+    # x: (N, H, W, C)，kernel 已攤平為 (3 * 3 * C, F)，以 im2col + 矩陣乘法計算 valid 卷積
+    n, h, w, c = x.shape
+    windows = np.lib.stride_tricks.sliding_window_view(x, (3, 3), axis=(1, 2))
+    cols = windows.transpose(0, 1, 2, 4, 5, 3).reshape(n * (h - 2) * (w - 2), 9 * c)
+    out = cols @ kernel
+    out += bias
+    np.maximum(out, 0, out=out)
+    return out.reshape(n, h - 2, w - 2, -1)
+
+def max_pool(x):
+    n, h, w, c = x.shape
+    x = x[:, :h // 2 * 2, :w // 2 * 2]
+    return x.reshape(n, h // 2, 2, w // 2, 2, c).max(axis=(2, 4))
+
+def forward(weights, x):
+    x = max_pool(conv2d_relu(x, weights['conv1_kernel'], weights['conv1_bias']))
+    x = max_pool(conv2d_relu(x, weights['conv2_kernel'], weights['conv2_bias']))
+    x = x.reshape(x.shape[0], -1)
+    x = np.maximum(x @ weights['dense1_kernel'] + weights['dense1_bias'], 0)
+    # Dropout 在推論時不作用；softmax 不影響 argmax，直接回傳 logits
+    return x @ weights['dense2_kernel'] + weights['dense2_bias']
+
+# 以 ONNX Runtime 在 GPU 上推論；未安裝 onnxruntime-gpu 或沒有 CUDA 裝置時回傳 None
+def load_gpu_session():
+    try:
+        import onnxruntime as ort
+    except ImportError:
+        logger.warning("未安裝 onnxruntime-gpu，改用 CPU")
+        return None
+    if 'CUDAExecutionProvider' not in ort.get_available_providers():
+        logger.warning("找不到 CUDAExecutionProvider，改用 CPU")
+        return None
+    try:
+        session = ort.InferenceSession(
+            'temp_model/digit_recognizer.onnx',
+            providers=['CUDAExecutionProvider', 'CPUExecutionProvider']
+        )
+    except Exception as e:
+        logger.warning(f"GPU 推論初始化失敗，改用 CPU: {str(e)}")
+        return None
+    # CUDA EP 初始化失敗（例如缺少 cuDNN）時 ONNX Runtime 會默默改用 CPU，需確認實際使用的 provider
+    if 'CUDAExecutionProvider' not in session.get_providers():
+        logger.warning(f"CUDAExecutionProvider 未啟用（實際為 {session.get_providers()}），改用 CPU")
+        return None
+    return session
+
+# 載入 NumPy 推論用的權重
+def load_weights(path):
+    weights = dict(np.load(path))
+    # 模型的 Rescaling(1/255) 層沒有權重，將其併入第一層卷積核，讓輸入可直接使用 uint8 像素值
+    weights['conv1_kernel'] = weights['conv1_kernel'] * np.float32(1.0 / 255.0)
+    for name in ('conv1_kernel', 'conv2_kernel'):
+        weights[name] = weights[name].reshape(-1, weights[name].shape[-1])
+    return weights
+
+# 載入所選裝置對應的模型檔，回傳以 (N, 28, 28, 1) uint8 圖片批次計算分數的函式
+def load_model():
+    gpu_session = load_gpu_session() if INFERENCE_DEVICE == 'gpu' else None
+    if gpu_session is not None:
+        gpu_input_name = gpu_session.get_inputs()[0].name
+
+        def run_model(x):
+            return gpu_session.run(None, {gpu_input_name: x.astype(np.float32)})[0]
+
+        logger.info("使用 GPU（ONNX Runtime CUDA）推論")
+    else:
+        weights = load_weights('temp_model/digit_recognizer.npz')
+
+        def run_model(x):
+            return forward(weights, x)
+
+        logger.info("使用 CPU（NumPy）推論")
+
+    # 預熱：先執行一次推論，讓權重分頁、BLAS 執行緒池或 GPU kernel 在第一個請求前就緒
+    run_model(np.zeros((1, 28, 28, 1), dtype=np.uint8))
+    return run_model
+
+# 批次推論：將同時到達的請求合併為一次前向運算
+MAX_BATCH = 16
+BATCH_TIMEOUT = 0.015  # 秒
+inference_queue = queue.Queue()
+
+class InferenceJob:
+    def __init__(self, img_array):
+        self.img_array = img_array
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+def inference_worker(run_model):
+    while True:
+        jobs = [inference_queue.get()]
+        deadline = time.time() + BATCH_TIMEOUT
+        while len(jobs) < MAX_BATCH:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                jobs.append(inference_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        try:
+            batch = np.concatenate([job.img_array for job in jobs])
+            prediction = run_model(batch)
+            for job, digit in zip(jobs, prediction.argmax(axis=1).tolist()):
+                job.result = digit
+            logger.info(f"批次推論完成，批次大小: {len(jobs)}")
+        except Exception as e:
+            logger.error(f"批次推論失敗: {str(e)}")
+            for job in jobs:
+                job.error = e
+        finally:
+            for job in jobs:
+                job.done.set()
+
+# 處理單一連線：驗證後持續接收 uint8 圖片位元組，回傳預測數字
+def handle_connection(conn, authkey):
+    try:
+        deliver_challenge(conn, authkey)
+        while True:
+            img_bytes = recv_frame(conn)
+            if len(img_bytes) != 28 * 28:
+                # 格式錯誤只影響這次請求，回覆錯誤後連線仍可繼續使用
+                send_prediction(conn, error=f"圖片大小錯誤: {len(img_bytes)} 位元組，應為 {28 * 28}")
+                continue
+            job = InferenceJob(np.frombuffer(img_bytes, dtype=np.uint8).reshape(1, 28, 28, 1))
+            inference_queue.put(job)
+            job.done.wait()
+            send_prediction(conn, digit=job.result, error=job.error)
+    except EOFError:
+        pass
+    except AuthenticationError as e:
+        logger.warning(str(e))
+    except Exception as e:
+        logger.error(f"連線處理失敗: {str(e)}")
+    finally:
+        conn.close()
+
+# 檢查推論伺服器是否已開始監聽並可完成驗證（供 start.sh 等待伺服器就緒）
+def is_ready():
+    if not INFERENCE_SERVER_AUTHKEY:
+        return False
+    try:
+        open_connection((INFERENCE_SERVER_HOST, INFERENCE_SERVER_PORT), INFERENCE_SERVER_AUTHKEY.encode(),
+                        timeout=5).close()
+        return True
+    except OSError:
+        return False
+
+if __name__ == "__main__":
+    if not INFERENCE_SERVER_AUTHKEY:
+        raise ValueError("INFERENCE_SERVER_AUTHKEY 未設置")
+
+    try:
+        run_model = load_model()
+        logger.info("模型載入成功")
+    except Exception as e:
+        logger.error(f"模型載入失敗: {str(e)}")
+        raise
+
+    threading.Thread(target=inference_worker, args=(run_model,), daemon=True).start()
+    address = (INFERENCE_SERVER_HOST, INFERENCE_SERVER_PORT)
+    with socket.create_server(address) as listener:
+        logger.info(f"推論伺服器啟動，監聽 {address}")
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError as e:
+                logger.error(f"接受連線失敗: {str(e)}")
+                continue
+            threading.Thread(target=handle_connection, args=(conn, INFERENCE_SERVER_AUTHKEY.encode()),
+                             daemon=True).start()
@@ -0,0 +1,59 @@
+import argparse
+
+import numpy as np
+import onnx
+from onnx import TensorProto, helper, numpy_helper
+
+# 由 train_model.py 匯出的 .npz 權重組出 ONNX 模型（供 inference_server.py 以 ONNX Runtime 在 GPU 上推論使用）。
+# 結構與 inference_server.py 的 NumPy 前向運算相同：
+# ×1/255 → Conv-ReLU-MaxPool ×2 → Flatten → Dense-ReLU → Dense → Softmax，
+# 輸入 'input' 為 (N, 28, 28, 1) 的 0~255 像素值（float32，NHWC），輸出 'output' 為各數字的機率。
+def export_onnx(npz_path, onnx_path):
+    weights = dict(np.load(npz_path))
+    initializers = [numpy_helper.from_array(np.array(1.0 / 255.0, dtype=np.float32), 'scale')]
+    for name in ('conv1', 'conv2'):
+        # Keras 卷積核為 (H, W, C_in, C_out)，ONNX Conv 需要 (C_out, C_in, H, W)
+        kernel = np.ascontiguousarray(weights[f'{name}_kernel'].transpose(3, 2, 0, 1))
+        initializers.append(numpy_helper.from_array(kernel, f'{name}_kernel'))
+        initializers.append(numpy_helper.from_array(weights[f'{name}_bias'], f'{name}_bias'))
+    for name in ('dense1', 'dense2'):
+        initializers.append(numpy_helper.from_array(weights[f'{name}_kernel'], f'{name}_kernel'))
+        initializers.append(numpy_helper.from_array(weights[f'{name}_bias'], f'{name}_bias'))
+
+    node = helper.make_node
+    nodes = [
+        node('Mul', ['input', 'scale'], ['rescaled']),
+        # ONNX Conv 使用 NCHW；Flatten 前轉回 NHWC，讓攤平順序與 Keras 的 Dense 權重一致
+        node('Transpose', ['rescaled'], ['nchw'], perm=[0, 3, 1, 2]),
+        node('Conv', ['nchw', 'conv1_kernel', 'conv1_bias'], ['conv1'], kernel_shape=[3, 3]),
+        node('Relu', ['conv1'], ['relu1']),
+        node('MaxPool', ['relu1'], ['pool1'], kernel_shape=[2, 2], strides=[2, 2]),
+        node('Conv', ['pool1', 'conv2_kernel', 'conv2_bias'], ['conv2'], kernel_shape=[3, 3]),
+        node('Relu', ['conv2'], ['relu2']),
+        node('MaxPool', ['relu2'], ['pool2'], kernel_shape=[2, 2], strides=[2, 2]),
+        node('Transpose', ['pool2'], ['nhwc'], perm=[0, 2, 3, 1]),
+        node('Flatten', ['nhwc'], ['flat'], axis=1),
+        node('MatMul', ['flat', 'dense1_kernel'], ['dense1']),
+        node('Add', ['dense1', 'dense1_bias'], ['dense1_biased']),
+        node('Relu', ['dense1_biased'], ['relu3']),
+        node('MatMul', ['relu3', 'dense2_kernel'], ['dense2']),
+        node('Add', ['dense2', 'dense2_bias'], ['logits']),
+        node('Softmax', ['logits'], ['output'], axis=-1),
+    ]
+    graph = helper.make_graph(
+        nodes, 'digit_recognizer',
+        [helper.make_tensor_value_info('input', TensorProto.FLOAT, ['N', 28, 28, 1])],
+        [helper.make_tensor_value_info('output', TensorProto.FLOAT, ['N', 10])],
+        initializers
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)], producer_name='digit_recognizer')
+    model.ir_version = 8  # onnxruntime 1.17 支援的版本
+    onnx.checker.check_model(model)
+    onnx.save(model, onnx_path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='將 .npz 權重轉換為 ONNX 模型')
+    parser.add_argument('npz_path', nargs='?', default='saved_model/digit_recognizer.npz')
+    parser.add_argument('onnx_path', nargs='?', default='saved_model/digit_recognizer.onnx')
+    args = parser.parse_args()
+    export_onnx(args.npz_path, args.onnx_path)
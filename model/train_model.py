@@ -1,23 +1,26 @@
+import os
 import tensorflow as tf
 from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Conv2D, MaxPooling2D, Flatten, Dense, Dropout
+from tensorflow.keras.layers import Rescaling, Conv2D, MaxPooling2D, Flatten, Dense, Dropout
 from tensorflow.keras.datasets import mnist
 import numpy as np
-import os
+from export_onnx import export_onnx
 
 # 確保 saved_model 資料夾存在
 os.makedirs('saved_model', exist_ok=True)
 
 # 載入並預處理 MNIST 資料集
 (x_train, y_train), (x_test, y_test) = mnist.load_data()
-x_train = x_train.reshape(-1, 28, 28, 1) / 255.0  # 調整為 (樣本數, 28, 28, 1)
-x_test = x_test.reshape(-1, 28, 28, 1) / 255.0
+# 保留 0~255 的 uint8 像素值，正規化交由模型的 Rescaling 層處理
+x_train = x_train.reshape(-1, 28, 28, 1)  # 調整為 (樣本數, 28, 28, 1)
+x_test = x_test.reshape(-1, 28, 28, 1)
 y_train = tf.keras.utils.to_categorical(y_train, num_classes=10)
 y_test = tf.keras.utils.to_categorical(y_test, num_classes=10)
 
 # 建立 CNN 模型
 model = Sequential([
-    Conv2D(32, (3, 3), activation='relu', input_shape=(28, 28, 1)),  # 輸入形狀為 (28, 28, 1)
+    Rescaling(1. / 255, input_shape=(28, 28, 1)),  # 輸入形狀為 (28, 28, 1)
+    Conv2D(32, (3, 3), activation='relu'),
     MaxPooling2D((2, 2)),
     Conv2D(64, (3, 3), activation='relu'),
     MaxPooling2D((2, 2)),
@@ -33,8 +36,35 @@ model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accur
 # 訓練模型
 model.fit(x_train, y_train, batch_size=128, epochs=10, validation_data=(x_test, y_test))
 
+# 建立不含 Dropout 的推論模型（Dropout 推論時不作用，且不含權重，可直接沿用權重）
+infer_model = Sequential([
+    layer.__class__.from_config(layer.get_config())
+    for layer in model.layers if not isinstance(layer, Dropout)
+])
+infer_model.set_weights(model.get_weights())
+
 # 儲存模型
-model.save('saved_model/digit_recognizer.h5')
+infer_model.save('saved_model/digit_recognizer.h5')
+
+# 匯出 SavedModel，附上固定輸入簽章的具體函式（供 TF Serving 等以 TensorFlow 推論的環境使用）
+@tf.function(input_signature=[tf.TensorSpec((None, 28, 28, 1), tf.float32)])
+def serve(x):
+    return infer_model(x, training=False)
+
+tf.saved_model.save(infer_model, 'saved_model/dr_sm',
+                    signatures={'serving_default': serve.get_concrete_function()})
+
+# 匯出各層權重（供 inference_server.py 以 NumPy 推論使用）
+weighted_layers = [layer for layer in infer_model.layers if layer.get_weights()]
+exported_weights = {}
+for name, layer in zip(['conv1', 'conv2', 'dense1', 'dense2'], weighted_layers):
+    kernel, bias = layer.get_weights()
+    exported_weights[f'{name}_kernel'] = kernel
+    exported_weights[f'{name}_bias'] = bias
+np.savez('saved_model/digit_recognizer.npz', **exported_weights)
+
+# 轉換為 ONNX 模型（供 inference_server.py 以 ONNX Runtime 在 GPU 上推論使用）
+export_onnx('saved_model/digit_recognizer.npz', 'saved_model/digit_recognizer.onnx')
 
 # 評估模型
 test_loss, test_acc = model.evaluate(x_test, y_test)
@@ -0,0 +1,37 @@
+#!/bin/bash
+# 先啟動推論伺服器（只載入一次模型），確認可以連線後再以 gevent worker 啟動 Flask，讓多個請求的 I/O 可以重疊。
+# 任一行程結束時停止另一個並結束此腳本，交由部署平台重新啟動整個服務。
+
+python inference_server.py &
+server_pid=$!
+
+# 等待推論伺服器就緒，最多 60 秒；伺服器啟動失敗時直接結束
+ready=0
+for _ in $(seq 60); do
+    if python -c 'import sys, inference_server; sys.exit(0 if inference_server.is_ready() else 1)'; then
+        ready=1
+        break
+    fi
+    if ! kill -0 "$server_pid" 2>/dev/null; then
+        echo "推論伺服器啟動失敗" >&2
+        exit 1
+    fi
+    sleep 1
+done
+if [ "$ready" -ne 1 ]; then
+    echo "推論伺服器未在時限內就緒" >&2
+    kill "$server_pid" 2>/dev/null
+    exit 1
+fi
+
+gunicorn -w 2 -k gevent --worker-connections 100 app:app --bind 0.0.0.0:${PORT:-5000} &
+gunicorn_pid=$!
+
+trap 'kill -TERM "$server_pid" "$gunicorn_pid" 2>/dev/null' TERM INT
+
+wait -n "$server_pid" "$gunicorn_pid"
+status=$?
+echo "推論伺服器或 gunicorn 已結束（狀態 $status），停止服務" >&2
+kill -TERM "$server_pid" "$gunicorn_pid" 2>/dev/null
+wait
+exit $(( status == 0 ? 1 : status ))
@@ -0,0 +1,52 @@
+import socket
+import threading
+
+import pytest
+
+from inference_protocol import (AuthenticationError, deliver_challenge, open_connection,
+                                recv_frame, request_prediction, send_prediction)
+
+
+# 啟動只處理一條連線的測試伺服器：驗證後將每張圖片回覆為其第一個位元組的值
+def serve_once(authkey):
+    listener = socket.create_server(('localhost', 0))
+
+    def handle():
+        conn, _ = listener.accept()
+        with conn, listener:
+            try:
+                deliver_challenge(conn, authkey)
+                while True:
+                    img_bytes = recv_frame(conn)
+                    if img_bytes[0] == 255:
+                        send_prediction(conn, error=ValueError('bad image'))
+                    else:
+                        send_prediction(conn, digit=img_bytes[0])
+            except (EOFError, AuthenticationError):
+                pass
+
+    threading.Thread(target=handle, daemon=True).start()
+    return listener.getsockname()
+
+
+def test_round_trip_reuses_connection():
+    address = serve_once(b'secret')
+    with open_connection(address, b'secret') as conn:
+        assert request_prediction(conn, bytes([3]) * 784) == 3
+        assert request_prediction(conn, bytes([7]) * 784) == 7
+        with pytest.raises(RuntimeError, match='bad image'):
+            request_prediction(conn, bytes([255]) * 784)
+
+
+def test_wrong_authkey_is_rejected():
+    address = serve_once(b'secret')
+    with pytest.raises(AuthenticationError):
+        open_connection(address, b'wrong')
+
+
+def test_stalled_server_times_out():
+    # 接受連線但不送出 challenge，模擬卡住的推論伺服器
+    listener = socket.create_server(('localhost', 0))
+    with listener:
+        with pytest.raises(socket.timeout):
+            open_connection(listener.getsockname(), b'secret', timeout=0.2)
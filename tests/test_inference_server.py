@@ -0,0 +1,96 @@
+import socket
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from inference_protocol import open_connection, request_prediction
+from inference_server import forward, handle_connection, load_weights
+
+WEIGHTS_PATH = Path(__file__).resolve().parents[1] / 'temp_model' / 'digit_recognizer.npz'
+
+
+# 以逐點迴圈實作的參考前向運算（輸入先除以 255，對應訓練時的正規化）
+def reference_forward(raw, x):
+    def conv2d_relu(x, kernel, bias):
+        n, h, w, _ = x.shape
+        out = np.zeros((n, h - 2, w - 2, kernel.shape[-1]))
+        for i in range(h - 2):
+            for j in range(w - 2):
+                out[:, i, j] = np.einsum('nabc,abcf->nf', x[:, i:i + 3, j:j + 3], kernel) + bias
+        return np.maximum(out, 0)
+
+    def max_pool(x):
+        n, h, w, c = x.shape
+        out = np.zeros((n, h // 2, w // 2, c))
+        for i in range(h // 2):
+            for j in range(w // 2):
+                out[:, i, j] = x[:, 2 * i:2 * i + 2, 2 * j:2 * j + 2].max(axis=(1, 2))
+        return out
+
+    x = x.astype(np.float64) / 255.0
+    x = max_pool(conv2d_relu(x, raw['conv1_kernel'], raw['conv1_bias']))
+    x = max_pool(conv2d_relu(x, raw['conv2_kernel'], raw['conv2_bias']))
+    x = x.reshape(x.shape[0], -1)
+    x = np.maximum(x @ raw['dense1_kernel'] + raw['dense1_bias'], 0)
+    return x @ raw['dense2_kernel'] + raw['dense2_bias']
+
+
+@pytest.fixture(scope='module')
+def images():
+    return np.random.default_rng(0).integers(0, 256, size=(4, 28, 28, 1), dtype=np.uint8)
+
+
+def test_forward_matches_reference(images):
+    raw = dict(np.load(WEIGHTS_PATH))
+    expected = reference_forward(raw, images)
+    logits = forward(load_weights(WEIGHTS_PATH), images)
+    assert logits.shape == (4, 10)
+    np.testing.assert_allclose(logits, expected, rtol=1e-4, atol=1e-3)
+    np.testing.assert_array_equal(logits.argmax(axis=1), expected.argmax(axis=1))
+
+
+def test_forward_matches_keras(images):
+    tf = pytest.importorskip('tensorflow')
+    model = tf.keras.models.load_model(WEIGHTS_PATH.with_suffix('.h5'))
+    x = images.astype(np.float32)
+    # 目前的 train_model.py 以 Rescaling(1/255) 開頭，直接接受 0~255 像素值；
+    # 較早訓練的 .h5 沒有這一層，需先自行除以 255
+    if not isinstance(model.layers[0], tf.keras.layers.Rescaling):
+        x = x / 255.0
+    expected = model.predict(x, verbose=0)
+    logits = forward(load_weights(WEIGHTS_PATH), images)
+    np.testing.assert_array_equal(logits.argmax(axis=1), expected.argmax(axis=1))
+
+
+def test_onnx_model_matches_forward(images):
+    ort = pytest.importorskip('onnxruntime')
+    session = ort.InferenceSession(str(WEIGHTS_PATH.with_suffix('.onnx')), providers=['CPUExecutionProvider'])
+    probabilities = session.run(None, {'input': images.astype(np.float32)})[0]
+    logits = forward(load_weights(WEIGHTS_PATH), images)
+    np.testing.assert_array_equal(probabilities.argmax(axis=1), logits.argmax(axis=1))
+
+
+def test_wrong_frame_size_keeps_connection():
+    listener = socket.create_server(('localhost', 0))
+
+    def accept():
+        conn, _ = listener.accept()
+        listener.close()
+        handle_connection(conn, b'secret')
+
+    threading.Thread(target=accept, daemon=True).start()
+    with open_connection(listener.getsockname(), b'secret') as conn:
+        for size in (100, 28 * 28 + 1):
+            with pytest.raises(RuntimeError, match='圖片大小錯誤'):
+                request_prediction(conn, bytes(size))
+
+
+def test_export_onnx_reproduces_shipped_model(tmp_path):
+    pytest.importorskip('onnx')
+    from model.export_onnx import export_onnx
+
+    onnx_path = tmp_path / 'digit_recognizer.onnx'
+    export_onnx(WEIGHTS_PATH, onnx_path)
+    assert onnx_path.read_bytes() == WEIGHTS_PATH.with_suffix('.onnx').read_bytes()